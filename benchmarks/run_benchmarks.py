@@ -0,0 +1,200 @@
+"""Time the Streamlit apps on synthetic data with Streamlit's headless AppTest.
+
+    python -m benchmarks.run_benchmarks --rows 10000 100000 1000000 --output benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json
+
+Each app runs once per size: a cold load (all caches cleared), a warm rerun,
+and then one rerun per filter change or chart/view switch. The results are
+written as JSON, and --compare exits with status 1 when a step got slower
+than the given baseline by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import altair  # noqa: F401  (imported up front so cold_load times data, not first imports)
+import pandas as pd
+import plotly.express  # noqa: F401
+import streamlit as st
+import streamlit_calendar  # noqa: F401
+from streamlit.testing.v1 import AppTest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import data_loader  # noqa: E402
+import dataset_watcher  # noqa: E402
+import figure_cache  # noqa: E402
+from benchmarks.synthetic import generate_bookings, generate_orders  # noqa: E402
+
+DEFAULT_ROWS = [10_000, 100_000]
+# Above this size the non-windowed calendar would ship millions of events; skip it
+FULL_CALENDAR_MAX_ROWS = 200_000
+
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+def _select(at, label, index):
+    # Widgets are looked up on the latest tree; stale handles would be ignored by run()
+    selectbox = _widget(at.selectbox, label)
+    selectbox.select(selectbox.options[index])
+
+
+class _Session:
+    def __init__(self, script, timeout):
+        self.app = AppTest.from_file(str(ROOT / script), default_timeout=timeout)
+        self.timings = {}
+
+    def step(self, name, interact=None):
+        if interact is not None:
+            interact(self.app)
+        start = time.perf_counter()
+        self.app.run()
+        self.timings[name] = time.perf_counter() - start
+        if self.app.exception:
+            raise RuntimeError(f"{name}: {self.app.exception[0].value}")
+
+
+def _reset_caches():
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    data_loader.clear_caches()
+    dataset_watcher.stop_all()
+    figure_cache.clear_all()
+
+
+def bench_dashboard(path, timeout):
+    os.environ['ORDERS_PATH'] = path
+    _reset_caches()
+    session = _Session('dashboardventas2025.py', timeout)
+    session.step('cold_load')
+    session.step('warm_rerun')
+    session.step('filter_region', lambda at: _select(at, 'Selecciona una Región', -1))
+    session.step('filter_state', lambda at: _select(at, 'Selecciona un Estado', 1))
+    session.step('filter_reset', lambda at: _select(at, 'Selecciona una Región', 0))
+    return session.timings
+
+
+def bench_calendar(path, rows, timeout):
+    os.environ['BOOKINGS_PATH'] = path
+    _reset_caches()
+    session = _Session('calendario.py', timeout)
+    session.step('cold_load')
+    session.step('warm_rerun')
+
+    date_range = _widget(session.app.date_input, 'Selecciona Rango de Fechas')
+    first, last = date_range.value
+    middle = first + (last - first) / 2
+    session.step('calendar_goto_date', lambda at: _widget(at.date_input, 'Ir a fecha').set_value(middle))
+    if rows <= FULL_CALENDAR_MAX_ROWS:
+        session.step('calendar_all_events',
+                     lambda at: _widget(at.checkbox, 'Cargar solo las fechas visibles').uncheck())
+        session.step('calendar_windowed',
+                     lambda at: _widget(at.checkbox, 'Cargar solo las fechas visibles').check())
+
+    session.step('filter_model', lambda at: _select(at, 'Filtrar por Modelo', 1))
+    session.step('filter_model_reset', lambda at: _select(at, 'Filtrar por Modelo', 0))
+    session.step('filter_dates',
+                 lambda at: _widget(at.date_input, 'Selecciona Rango de Fechas').set_value((middle, last)))
+    session.step('list_view', lambda at: _widget(at.radio, 'Seleccionar Vista').set_value('Lista'))
+    session.step('list_next_page', lambda at: _widget(at.number_input, 'Página').increment())
+
+    session.step('top5_year', lambda at: _select(at, 'Selecciona el Año', -1))
+    session.step('top5_all_months', lambda at: _widget(at.checkbox, 'Ver todos los meses del año').check())
+    return session.timings
+
+
+def run(rows_list, repeat, seed, data_dir, timeout):
+    results = []
+    for rows in rows_list:
+        orders_path = os.path.join(data_dir, f'orders_{rows}_{seed}.parquet')
+        bookings_path = os.path.join(data_dir, f'bookings_{rows}_{seed}.parquet')
+        if not os.path.exists(orders_path):
+            generate_orders(rows, seed).to_parquet(orders_path)
+        if not os.path.exists(bookings_path):
+            generate_bookings(rows, seed).to_parquet(bookings_path)
+
+        for app, bench in [('dashboard', lambda: bench_dashboard(orders_path, timeout)),
+                           ('calendar', lambda: bench_calendar(bookings_path, rows, timeout))]:
+            samples = {}
+            for _ in range(repeat):
+                for step, seconds in bench().items():
+                    samples.setdefault(step, []).append(seconds)
+            for step, values in samples.items():
+                results.append({'app': app, 'rows': rows, 'step': step,
+                                'seconds': statistics.median(values), 'samples': values})
+                print(f"{app:<10} {rows:>10} {step:<22} {statistics.median(values) * 1000:10.1f} ms")
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta):
+    previous = {(r['app'], r['rows'], r['step']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    for result in results:
+        key = (result['app'], result['rows'], result['step'])
+        if key not in previous:
+            continue
+        before, after = previous[key], result['seconds']
+        if after > before * (1 + tolerance) and after - before > min_delta:
+            regressions.append((key, before, after))
+    for (app, rows, step), before, after in regressions:
+        print(f"REGRESSION {app} {rows} {step}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help="dataset sizes to run (10000 up to 10000000)")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per size; the median is reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help="keep the generated Parquet files here instead of a temp folder")
+    parser.add_argument('--timeout', type=float, default=600, help="seconds allowed per app rerun")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON to check the results against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        os.makedirs(data_dir, exist_ok=True)
+        results = run(args.rows, args.repeat, args.seed, data_dir, args.timeout)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'streamlit': st.__version__,
+            'machine': platform.machine(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance, args.min_delta):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Seeded synthetic data shaped like OrdersFinal.xlsx and the Control de Fechas workbooks.
+
+Text columns are generated as categoricals so that tens of millions of rows
+stay cheap to build and to write as Parquet.
+"""
+import numpy as np
+import pandas as pd
+
+REGION_STATES = {
+    'South': ['Kentucky', 'Virginia', 'Alabama', 'Florida', 'North Carolina', 'Tennessee',
+              'Georgia', 'Louisiana', 'South Carolina', 'Mississippi', 'Arkansas'],
+    'East': ['New York', 'Pennsylvania', 'Ohio', 'Delaware', 'Massachusetts', 'New Jersey',
+             'Connecticut', 'Maryland', 'Rhode Island', 'New Hampshire', 'Vermont', 'Maine',
+             'West Virginia', 'District of Columbia'],
+    'central': ['Texas', 'Wisconsin', 'Illinois', 'Michigan', 'Indiana', 'Minnesota', 'Missouri',
+                'Iowa', 'Nebraska', 'Oklahoma', 'Kansas', 'South Dakota', 'North Dakota'],
+    'West': ['California', 'Washington', 'Oregon', 'Arizona', 'Utah', 'Colorado', 'Nevada',
+             'New Mexico', 'Idaho', 'Montana', 'Wyoming'],
+}
+
+MODELOS = [
+    'Brincolín de Paw Patrol', 'Brincolín de Princesa', 'Bungee Run', 'Castillo Medieval',
+    'Castillo de Fantasía', 'Castillo de Princesa', 'Combo Deportivo', 'Combo Deportivo XL',
+    'Inflable Acuático', 'Inflable Patrulla Canina', 'Inflable Temático Selva', 'Inflable de Fútbol',
+    'Mini Parque Acuático', 'Muro de Escalada', 'Muro de Escalada Pequeño', 'Pista de Obstáculos X',
+    'Pista de Obstáculos XL', 'Tobogán Gigante', 'Tobogán Gigante Acuático', 'Tobogán Grande',
+    'Tobogán Seco Doble',
+]
+SUPERFICIES = ['Pasto', 'Cemento', 'Tierra', 'Arena']
+HORAS = [f'{hour:02d}:{minute:02d}:00' for hour in range(9, 20) for minute in (0, 30)]
+
+
+def _categorical(rng, values, n, p=None):
+    codes = rng.choice(len(values), size=n, p=p)
+    return pd.Categorical.from_codes(codes, categories=values)
+
+
+def _zipf_weights(k, exponent=1.1):
+    weights = 1.0 / np.arange(1, k + 1) ** exponent
+    return weights / weights.sum()
+
+
+def generate_orders(n_rows, seed=0, n_products=1800):
+    """Orders with the Region/State/Product Name/Quantity/Profit columns the dashboard uses."""
+    rng = np.random.default_rng(seed)
+    pairs = [(region, state) for region, states in REGION_STATES.items() for state in states]
+    pair_codes = rng.choice(len(pairs), size=n_rows, p=_zipf_weights(len(pairs), 0.8))
+    regions = list(REGION_STATES)
+    region_of_pair = np.array([regions.index(region) for region, _ in pairs])
+    states = [state for _, state in pairs]
+
+    products = [f'Product {i:05d}' for i in range(n_products)]
+    quantity = rng.integers(1, 15, size=n_rows)
+    profit = np.round(rng.normal(28.0, 230.0, size=n_rows), 4)
+    return pd.DataFrame({
+        'Product Name': _categorical(rng, products, n_rows, _zipf_weights(n_products)),
+        'Quantity': quantity,
+        'Profit': profit,
+        'Region': pd.Categorical.from_codes(region_of_pair[pair_codes], categories=regions),
+        'State': pd.Categorical.from_codes(pair_codes, categories=states),
+    })
+
+
+def generate_bookings(n_rows, seed=0, start='2020-01-01'):
+    """Bookings with the FECHA/MODELO/HORA/SUPERFICIE/DIRECCION/NOMBRE/CELULAR columns of calendario.py."""
+    rng = np.random.default_rng(seed)
+    # Roughly 50 bookings a day, spread over one to twenty years
+    span_days = min(20 * 365, max(365, n_rows // 50))
+    fechas = pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, span_days, size=n_rows), unit='D')
+
+    n_people = max(100, n_rows // 20)
+    nombres = [f'Cliente {i:07d}' for i in range(min(n_people, 200_000))]
+    direcciones = [f'Calle {i % 120}, #{i}, Col. Centro' for i in range(min(n_people, 200_000))]
+    return pd.DataFrame({
+        'MODELO': _categorical(rng, MODELOS, n_rows, _zipf_weights(len(MODELOS), 0.7)),
+        'FECHA': fechas,
+        'HORA': _categorical(rng, HORAS, n_rows),
+        'SUPERFICIE': _categorical(rng, SUPERFICIES, n_rows),
+        'DIRECCION': _categorical(rng, direcciones, n_rows),
+        'NOMBRE': _categorical(rng, nombres, n_rows),
+        'CELULAR': rng.integers(9_800_000_000, 9_999_999_999, size=n_rows),
+    })
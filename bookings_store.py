@@ -0,0 +1,237 @@
+"""Merge every Control de Fechas workbook into one indexed SQLite store.
+
+Run `python bookings_store.py [paths...]` to ingest new or changed workbooks
+(the current folder by default). calendario.py reads from the store when it
+exists instead of parsing a spreadsheet.
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import unicodedata
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from data_loader import file_sha256, read_excel_cached
+
+DEFAULT_DB_PATH = 'bookings.sqlite'
+
+BOOKING_COLUMNS = ['MODELO', 'FECHA', 'HORA', 'SUPERFICIE', 'DIRECCION', 'NOMBRE',
+                   'CELULAR', 'ANTICIPO', 'SALDO', 'TOTAL']
+
+# Fields that identify a booking across snapshots; text is compared without
+# accents, case or punctuation because the "cleaned" copies strip them.
+_KEY_COLUMNS = ['FECHA', 'HORA', 'MODELO', 'CELULAR']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    booking_key TEXT PRIMARY KEY,
+    MODELO TEXT NOT NULL,
+    FECHA TEXT NOT NULL,
+    HORA TEXT,
+    SUPERFICIE TEXT,
+    DIRECCION TEXT,
+    NOMBRE TEXT,
+    CELULAR INTEGER,
+    ANTICIPO INTEGER,
+    SALDO INTEGER,
+    TOTAL INTEGER
+);
+CREATE TABLE IF NOT EXISTS booking_sources (
+    booking_key TEXT NOT NULL,
+    source_path TEXT NOT NULL,
+    row_hash TEXT,
+    PRIMARY KEY (booking_key, source_path)
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_fecha ON bookings (FECHA);
+CREATE INDEX IF NOT EXISTS idx_bookings_modelo_fecha ON bookings (MODELO, FECHA);
+CREATE INDEX IF NOT EXISTS idx_booking_sources_path ON booking_sources (source_path);
+"""
+
+_ZIP_MAGIC = b'PK\x03\x04'
+
+
+def is_excel_workbook(path):
+    # Look at the content, not the extension: some workbooks in the repo are named *.py
+    try:
+        with open(path, 'rb') as f:
+            if f.read(4) != _ZIP_MAGIC:
+                return False
+        with zipfile.ZipFile(path) as archive:
+            return 'xl/workbook.xml' in archive.namelist()
+    except (OSError, zipfile.BadZipFile):
+        return False
+
+
+def find_workbooks(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.scandir(path), key=lambda e: e.name):
+                if entry.is_file() and not entry.name.startswith('.') and is_excel_workbook(entry.path):
+                    found.append(entry.path)
+        elif is_excel_workbook(path):
+            found.append(path)
+    return found
+
+
+def _fold(value):
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(c for c in text if c.isalnum() or c.isspace())
+    return ' '.join(text.casefold().split())
+
+
+def _normalize_column(name):
+    return _fold(name).upper().replace(' ', '_')
+
+
+def normalize_bookings(df):
+    """Map a workbook's columns onto BOOKING_COLUMNS, as stored in SQLite."""
+    df = df.rename(columns=_normalize_column)
+    if 'FECHA' not in df.columns or 'MODELO' not in df.columns:
+        raise ValueError("the workbook must contain 'FECHA' and 'MODELO' columns")
+    df = df.reindex(columns=BOOKING_COLUMNS)
+    df = df.dropna(subset=['FECHA', 'MODELO'])
+    df['FECHA'] = pd.to_datetime(df['FECHA']).dt.strftime('%Y-%m-%d %H:%M:%S')
+    for column in ['MODELO', 'HORA', 'SUPERFICIE', 'DIRECCION', 'NOMBRE']:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    for column in ['CELULAR', 'ANTICIPO', 'SALDO', 'TOTAL']:
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+
+    key_text = df[_KEY_COLUMNS].astype(str).agg('|'.join, axis=1).map(_fold)
+    df.insert(0, 'booking_key', key_text.map(lambda text: hashlib.sha1(text.encode()).hexdigest()))
+    return df.drop_duplicates('booking_key')
+
+
+def connect(db_path=DEFAULT_DB_PATH, read_only=False):
+    if read_only:
+        return sqlite3.connect(Path(db_path).absolute().as_uri() + '?mode=ro', uri=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(_SCHEMA)
+    if 'row_hash' not in {row[1] for row in conn.execute("PRAGMA table_info(booking_sources)")}:
+        # Stores built before row hashes; their rows count as unedited until re-ingested
+        conn.execute("ALTER TABLE booking_sources ADD COLUMN row_hash TEXT")
+    return conn
+
+
+def _replace_source(conn, source_path, bookings):
+    previous = dict(conn.execute(
+        "SELECT booking_key, row_hash FROM booking_sources WHERE source_path = ?", (source_path,)))
+    conn.execute("DELETE FROM booking_sources WHERE source_path = ?", (source_path,))
+    rows = bookings.astype(object).where(bookings.notna(), None)[['booking_key'] + BOOKING_COLUMNS]
+    records = list(rows.itertuples(index=False, name=None))
+    row_hashes = [hashlib.sha1(repr(record[1:]).encode()).hexdigest() for record in records]
+
+    # A row this workbook already held and has since edited takes the new values.
+    # Any other row (new to it, or unchanged, e.g. a snapshot saved again) leaves the
+    # booking alone, so the first snapshot that saw it keeps its text (accents included).
+    edited = [previous.get(record[0]) not in (None, row_hash) for record, row_hash in zip(records, row_hashes)]
+    insert = (f"INSERT INTO bookings (booking_key, {', '.join(BOOKING_COLUMNS)}) "
+              f"VALUES ({', '.join('?' * (len(BOOKING_COLUMNS) + 1))}) ")
+    conn.executemany(
+        insert + "ON CONFLICT (booking_key) DO UPDATE SET "
+        + ', '.join(f"{column} = excluded.{column}" for column in BOOKING_COLUMNS),
+        (record for record, is_edited in zip(records, edited) if is_edited))
+    conn.executemany(insert + "ON CONFLICT (booking_key) DO NOTHING",
+                     (record for record, is_edited in zip(records, edited) if not is_edited))
+    conn.executemany("INSERT INTO booking_sources (booking_key, source_path, row_hash) VALUES (?, ?, ?)",
+                     ((record[0], source_path, row_hash) for record, row_hash in zip(records, row_hashes)))
+
+
+def _drop_source(conn, source_path):
+    conn.execute("DELETE FROM booking_sources WHERE source_path = ?", (source_path,))
+    conn.execute("DELETE FROM sources WHERE path = ?", (source_path,))
+
+
+def ingest(paths=('.',), db_path=DEFAULT_DB_PATH):
+    """Load new or changed workbooks into the store and return a summary dict."""
+    workbooks = find_workbooks(paths)
+    scanned_dirs = {os.path.abspath(p) for p in paths if os.path.isdir(p)}
+    summary = {'ingested': [], 'unchanged': [], 'removed': [], 'failed': {}}
+
+    conn = connect(db_path)
+    try:
+        with conn:
+            known = {row[0]: row[1:] for row in conn.execute("SELECT path, size, mtime_ns, sha256 FROM sources")}
+            current = {os.path.abspath(p) for p in workbooks}
+
+            # Workbooks deleted from a scanned folder no longer vouch for their bookings
+            for source_path in known:
+                if os.path.dirname(source_path) in scanned_dirs and source_path not in current:
+                    _drop_source(conn, source_path)
+                    summary['removed'].append(source_path)
+
+            for path in workbooks:
+                source_path = os.path.abspath(path)
+                stat = os.stat(path)
+                previous = known.get(source_path)
+                if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                    summary['unchanged'].append(source_path)
+                    continue
+                sha256 = file_sha256(path)
+                if previous and previous[2] == sha256:
+                    summary['unchanged'].append(source_path)
+                else:
+                    try:
+                        bookings = normalize_bookings(read_excel_cached(path))
+                    except Exception as e:
+                        # Missing columns or a broken sheet: skip this workbook only, and
+                        # remember it anyway so it is only looked at again once it changes
+                        conn.execute("DELETE FROM booking_sources WHERE source_path = ?", (source_path,))
+                        summary['failed'][source_path] = f'{type(e).__name__}: {e}'
+                    else:
+                        _replace_source(conn, source_path, bookings)
+                        summary['ingested'].append(source_path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO sources (path, size, mtime_ns, sha256, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                    (source_path, stat.st_size, stat.st_mtime_ns, sha256,
+                     datetime.now(timezone.utc).isoformat(timespec='seconds')))
+
+            conn.execute("DELETE FROM bookings WHERE booking_key NOT IN (SELECT booking_key FROM booking_sources)")
+            summary['bookings'] = conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+    finally:
+        conn.close()
+    return summary
+
+
+def _to_frame(conn, sql):
+    df = pd.read_sql_query(sql, conn)
+    df['FECHA'] = pd.to_datetime(df['FECHA'])
+    return df
+
+
+def read_bookings(db_path=DEFAULT_DB_PATH):
+    """Every booking in the store, sorted by FECHA."""
+    conn = connect(db_path, read_only=True)
+    try:
+        return _to_frame(conn, f"SELECT {', '.join(BOOKING_COLUMNS)} FROM bookings ORDER BY FECHA")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Ingest Control de Fechas workbooks into a SQLite store.")
+    parser.add_argument('paths', nargs='*', default=['.'], help="workbooks or folders to scan (default: .)")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help=f"SQLite file to update (default: {DEFAULT_DB_PATH})")
+    args = parser.parse_args()
+
+    result = ingest(args.paths, args.db)
+    for source_path in result['ingested']:
+        print(f"ingested   {source_path}")
+    for source_path in result['unchanged']:
+        print(f"unchanged  {source_path}")
+    for source_path in result['removed']:
+        print(f"removed    {source_path}")
+    for source_path, error in result['failed'].items():
+        print(f"skipped    {source_path}: {error}")
+    print(f"{result['bookings']} bookings in {args.db}")
@@ -1,53 +1,187 @@
 import streamlit as st
 from streamlit_calendar import calendar
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 import altair as alt # Import Altair
+import os
+
+import dataset_watcher
+import perf_trace
+from figure_cache import figure_cache
+from bookings_store import DEFAULT_DB_PATH, read_bookings
+from data_loader import load_frame, read_source
 
 st.set_page_config(layout="wide")
 
 st.title("Mi Calendario de Eventos 📅")
 
+# Opt-in rerun timings (PERF_TRACE=1 or ?perf=1), see perf_trace.py
+trace = perf_trace.start('calendario')
+
 # --- Load and Prepare Data for the Streamlit app ---
-excel_file_path = 'Control de Fechas 2025 Auto Finaaaal.xlsx'
+# BOOKINGS_PATH points the app at another workbook or a Parquet/CSV export (see benchmarks/)
+excel_file_path = os.environ.get('BOOKINGS_PATH', 'Control de Fechas 2025 Auto Finaaaal.xlsx')
+# Built by `python bookings_store.py`; when present it replaces the default workbook
+bookings_db_path = DEFAULT_DB_PATH
+use_bookings_store = 'BOOKINGS_PATH' not in os.environ and os.path.exists(bookings_db_path)
+
+
+def build_events(df):
+    # Build the FullCalendar events column by column instead of row by row
+    if df['FECHA'].hasnans:
+        # A booking without a date has no place on the calendar (and NaN is not valid JSON)
+        df = df[df['FECHA'].notna()]
+    titles = df['MODELO'].astype(str).tolist()
+    starts = df['FECHA'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+    direcciones = df['DIRECCION'].astype(str).tolist()
+    horas = df['HORA'].astype(str).tolist()
+    superficies = df['SUPERFICIE'].astype(str).tolist()
+    return [
+        {
+            "title": title,
+            "start": start,
+            "allDay": True,
+            "extendedProps": { # Add other relevant data here for potential future use or display
+                "direccion": direccion,
+                "hora": hora,
+                "superficie": superficie # Include superficie for potential future use/display
+            }
+        }
+        for title, start, direccion, hora, superficie in zip(titles, starts, direcciones, horas, superficies)
+    ]
+
+
+# Rows per page offered by the list view
+LIST_PAGE_SIZES = [50, 100, 500]
+
+# Days loaded on each side of the visible range, so prev/next stays populated
+CALENDAR_PREFETCH = pd.Timedelta(days=45)
+
+
+# Sorted FECHA values plus, per model, the positions of its rows and their FECHA
+# values, built once per data version. The frame is sorted by FECHA, so any
+# date range of all bookings or of one model is found by binary search.
+def build_booking_index(df, version):
+    fechas = df['FECHA'].to_numpy()
+    codes = df['MODELO'].cat.codes.to_numpy()
+    order = np.argsort(codes, kind='stable')  # stable: each model's rows stay in date order
+    bounds = np.searchsorted(codes[order], np.arange(len(df['MODELO'].cat.categories) + 1))
+    models = {}
+    for code, model in enumerate(df['MODELO'].cat.categories):
+        rows = order[bounds[code]:bounds[code + 1]]
+        if len(rows):
+            models[str(model)] = (rows, fechas[rows])
+    dated = fechas[~np.isnat(fechas)]
+    return {
+        'rows': range(len(df)),
+        'fechas': fechas,
+        'models': models,
+        'first': pd.Timestamp(dated[0]) if len(dated) else None,
+        'last': pd.Timestamp(dated[-1]) if len(dated) else None,
+    }
+
+
+def index_rows(index, start=None, end=None, model=None):
+    """Positions of the bookings from `start` to `end` (inclusive) of `model`, in date order.
+
+    Without a model this is a range, so slicing it never copies.
+    """
+    rows, fechas = (index['rows'], index['fechas']) if model is None else index['models'].get(
+        model, (np.empty(0, dtype=np.intp), index['fechas'][:0]))
+    lo = 0 if start is None else np.searchsorted(fechas, np.datetime64(start), side='left')
+    hi = len(rows) if end is None else np.searchsorted(fechas, np.datetime64(end), side='right')
+    return rows[lo:hi]
+
+
+def take_rows(df, rows):
+    # A range is a contiguous block of the sorted frame: slice it instead of gathering
+    if isinstance(rows, range):
+        return df.iloc[rows.start:rows.stop]
+    return df.iloc[rows]
+
+
+def reported_view_range(component_value):
+    # Every calendar callback carries the view the user is looking at
+    if not component_value:
+        return None
+    payload = component_value.get(component_value.get('callback'))
+    view = payload.get('view') if isinstance(payload, dict) else None
+    if not view:
+        return None
+    start = pd.Timestamp(view['activeStart']).tz_localize(None).normalize()
+    end = pd.Timestamp(view['activeEnd']).tz_localize(None).normalize()
+    return start, end
+
+
+TOP_N_INFLABLES = 5
+
+
+def vega_lite_spec(chart):
+    # Rendered like st.altair_chart does, without the default theme's fixed 300px view
+    with alt.themes.enable('none'):
+        return chart.to_dict()
+
+
+# (year, month, MODELO) -> rentals, built once per workbook version. Rows are
+# ordered by month and then by count, so the top N of a month are its first N rows.
+# Kept in the dataset watcher's snapshot and shared by every session, so it is only ever read.
+def build_monthly_counts(df, version):
+    counts = df.groupby(
+        [df['FECHA'].dt.year.rename('YEAR'), df['FECHA'].dt.month.rename('MONTH'), 'MODELO'],
+        observed=True
+    ).size().rename('Conteo de Rentas').reset_index()
+    counts['MODELO'] = counts['MODELO'].astype(str)
+    # Stable sort keeps models alphabetical on ties
+    return counts.sort_values(['YEAR', 'MONTH', 'Conteo de Rentas'], ascending=[True, True, False],
+                              kind='stable', ignore_index=True)
 
-original_events_app = [] # Store all events initially
+
+trace.stage('load')
 df_app = pd.DataFrame()
+bookings_version = None
+
+def load_bookings(path):
+    # Parsed, converted and sorted by date once per data version, shared by all reruns and sessions
+    df = load_frame(path, dates=['FECHA'], categories=['MODELO'], sort_by='FECHA',
+                    reader=read_bookings if use_bookings_store else read_source)
+    # Checked before the watcher builds the counts and the index, which need both columns
+    if 'FECHA' not in df.columns or 'MODELO' not in df.columns:
+        raise ValueError(
+            "The Excel file must contain 'FECHA' and 'MODELO' columns for the calendar and filtering.")
+    return df
+
 
 try:
-    df_app = pd.read_excel(excel_file_path)
-    if 'FECHA' in df_app.columns and 'MODELO' in df_app.columns:
-        df_app['FECHA'] = pd.to_datetime(df_app['FECHA'])
-
-        for index, row in df_app.iterrows():
-            event = {
-                "title": str(row['MODELO']),
-                "start": row['FECHA'].isoformat(),
-                "allDay": True,
-                "extendedProps": { # Add other relevant data here for potential future use or display
-                    "direccion": str(row['DIRECCION']),
-                    "hora": str(row['HORA']),
-                    "superficie": str(row['SUPERFICIE']) # Include superficie for potential future use/display
-                }
-            }
-            original_events_app.append(event)
-    else:
-        st.error("Error: The Excel file must contain 'FECHA' and 'MODELO' columns for the calendar and filtering.")
+    bookings_source = bookings_db_path if use_bookings_store else excel_file_path
+    # Reloaded in the background when the file changes; reruns get the last complete version
+    bookings = dataset_watcher.watch('bookings', bookings_source, load_bookings,
+                                     {'monthly_counts': build_monthly_counts,
+                                      'booking_index': build_booking_index})
+    bookings_snapshot = bookings.snapshot()
+    df_app, bookings_version = bookings_snapshot.frame, bookings_snapshot.version
+    if bookings.error:
+        st.sidebar.warning(f"No se pudo recargar '{bookings_source}' ({bookings.error}); "
+                           "se muestran los datos anteriores.")
+except ValueError as e:
+    st.error(f"Error: {e}")
 except FileNotFoundError:
     st.error(f"Error: The Excel file '{excel_file_path}' was not found. Please check the path.")
 except Exception as e:
     st.error(f"An error occurred while loading or processing the Excel file: {e}")
 
 # --- Filtering Options in Sidebar ---
+trace.stage('filters')
 st.sidebar.header("Filtrar Eventos")
 
 # Ensure df_app is not empty before attempting to filter
+filtered_rows = range(0)
 if not df_app.empty:
-    filtered_df_app = df_app.copy()
+    booking_index = bookings_snapshot.derived['booking_index']
 
     # Date Range Filter
-    min_date_val = filtered_df_app['FECHA'].min().date() if not filtered_df_app.empty else date.today()
-    max_date_val = filtered_df_app['FECHA'].max().date() if not filtered_df_app.empty else date.today()
+    min_date_val = booking_index['first'].date()
+    max_date_val = booking_index['last'].date()
 
     date_range = st.sidebar.date_input(
         "Selecciona Rango de Fechas",
@@ -56,44 +190,23 @@ if not df_app.empty:
         max_value=max_date_val
     )
 
+    start_date_filter = end_date_filter = None
     if date_range and len(date_range) == 2:
         start_date_filter = pd.Timestamp(date_range[0])
         end_date_filter = pd.Timestamp(date_range[1])
-        filtered_df_app = filtered_df_app[
-            (filtered_df_app['FECHA'] >= start_date_filter) &
-            (filtered_df_app['FECHA'] <= end_date_filter)
-        ]
 
     # Model Filter (changed to selectbox with 'Todos los modelos' option)
-    unique_models = df_app['MODELO'].unique().tolist() if not df_app.empty else []
-    model_options = ['Todos los modelos'] + sorted(unique_models)
+    model_options = ['Todos los modelos'] + sorted(booking_index['models'])
     selected_model = st.sidebar.selectbox(
         "Filtrar por Modelo",
         options=model_options,
         index=0 # 'Todos los modelos' selected by default
     )
+    model_filter = None if selected_model == 'Todos los modelos' else selected_model
 
-    if selected_model != 'Todos los modelos':
-        filtered_df_app = filtered_df_app[filtered_df_app['MODELO'] == selected_model]
-
-    # Re-prepare events based on filtered DataFrame (this is mostly for calendar view)
-    events_to_display = []
-    if not filtered_df_app.empty:
-        for index, row in filtered_df_app.iterrows():
-            event = {
-                "title": str(row['MODELO']),
-                "start": row['FECHA'].isoformat(),
-                "allDay": True,
-                "extendedProps": {
-                    "direccion": str(row['DIRECCION']),
-                    "hora": str(row['HORA']),
-                    "superficie": str(row['SUPERFICIE'])
-                }
-            }
-            events_to_display.append(event)
+    # Binary search on the date index, no per-rerun masks or SQL queries
+    filtered_rows = index_rows(booking_index, start_date_filter, end_date_filter, model_filter)
 else:
-    events_to_display = []
-    filtered_df_app = pd.DataFrame() # Ensure this is empty too if data not loaded
     st.warning("No se pudo cargar la base de datos para filtrar.")
 
 
@@ -109,6 +222,19 @@ if view_type == 'Calendario':
         index=0 # Default to month view
     )
 
+    # Windowed mode only sends the events around the visible dates to the browser
+    windowed_calendar = st.checkbox("Cargar solo las fechas visibles", value=True)
+    calendar_key = "fullcalendar"
+    calendar_anchor = None
+    if windowed_calendar:
+        # Start on today, or on the nearest date that has bookings
+        default_anchor = date.today()
+        if len(filtered_rows):
+            default_anchor = min(max(default_anchor, min_date_val), max_date_val)
+        calendar_anchor = st.date_input("Ir a fecha", value=default_anchor)
+        # A new anchor remounts the calendar on that date
+        calendar_key = f"fullcalendar-{calendar_anchor.isoformat()}"
+
     # --- Calendar Configuration ---
     calendar_options = {
         "editable": "true",
@@ -123,8 +249,36 @@ if view_type == 'Calendario':
         "height": "auto" # Adjust height automatically
     }
 
-    if events_to_display:
-        st.subheader(f"Eventos cargados: {len(events_to_display)}")
+    if len(filtered_rows):
+        trace.stage('events')
+        if windowed_calendar:
+            calendar_options["initialDate"] = calendar_anchor.isoformat()
+            # streamlit-calendar reports nothing on prev/next, so those buttons would walk
+            # out of the loaded window into empty months; "Ir a fecha" moves it instead
+            calendar_options["headerToolbar"] = dict(calendar_options["headerToolbar"], left="")
+            # Follow the range reported by the calendar, or start around the anchor date
+            view_start, view_end = st.session_state.get(calendar_key + "-view") or (
+                pd.Timestamp(calendar_anchor), pd.Timestamp(calendar_anchor))
+            # The window within the filters, straight from the date index
+            window_start, window_end = view_start - CALENDAR_PREFETCH, view_end + CALENDAR_PREFETCH
+            if start_date_filter is not None:
+                window_start = max(window_start, start_date_filter)
+                window_end = min(window_end, end_date_filter)
+            window_rows = index_rows(booking_index, window_start, window_end, model_filter)
+            events_to_display = build_events(take_rows(df_app, window_rows))
+            st.subheader(f"Eventos cargados: {len(events_to_display)} de {len(filtered_rows)}")
+            if window_start <= window_end:
+                loaded = f"Fechas cargadas: del {window_start:%d/%m/%Y} al {window_end:%d/%m/%Y}."
+            else:
+                loaded = "No hay fechas cargadas alrededor de esta fecha con los filtros seleccionados."
+            st.caption(f"{loaded} Usa «Ir a fecha» para ver otras fechas, o desactiva «Cargar solo "
+                       "las fechas visibles» para navegar con todos los eventos.")
+        else:
+            events_to_display = build_events(take_rows(df_app, filtered_rows))
+            st.subheader(f"Eventos cargados: {len(events_to_display)}")
+        trace.payload('events', events_to_display)
+
+        trace.stage('calendar_render')
         calendar_component = calendar(events=events_to_display,
                                       options=calendar_options,
                                       custom_css="""
@@ -141,18 +295,37 @@ if view_type == 'Calendario':
                                               font-size: 2rem;
                                           }
                                       """,
-                                      key="fullcalendar")
+                                      key=calendar_key)
 
         st.write(calendar_component)
+
+        if windowed_calendar:
+            view_range = reported_view_range(calendar_component)
+            if view_range and view_range != st.session_state.get(calendar_key + "-view"):
+                # The user moved to another range: serve the events around it
+                st.session_state[calendar_key + "-view"] = view_range
+                st.rerun()
     else:
         st.warning("No hay eventos para mostrar con los filtros seleccionados.")
 
 elif view_type == 'Lista':
+    trace.stage('list_view')
     st.subheader("Lista de Eventos")
-    if not filtered_df_app.empty:
+    if len(filtered_rows):
+        # Rows are already in date order: only the requested page is gathered and sent
+        page_size = st.selectbox("Filas por página", LIST_PAGE_SIZES, index=1)
+        page_count = -(-len(filtered_rows) // page_size)
+        page = st.number_input("Página", min_value=1, max_value=page_count, value=1, step=1)
+        offset = (page - 1) * page_size
+        page_rows = filtered_rows[offset:offset + page_size]
+
         # Select relevant columns for the list view
         display_columns = ['MODELO', 'FECHA', 'HORA', 'SUPERFICIE', 'DIRECCION', 'NOMBRE', 'CELULAR']
-        st.dataframe(filtered_df_app[display_columns].sort_values(by='FECHA').reset_index(drop=True))
+        list_df = take_rows(df_app, page_rows)[display_columns]
+        list_df.index = pd.RangeIndex(offset, offset + len(list_df))
+        st.caption(f"Eventos {offset + 1}–{offset + len(list_df)} de {len(filtered_rows)}")
+        st.dataframe(list_df)
+        trace.payload('list_view', list_df)
     else:
         st.warning("No hay eventos para mostrar con los filtros seleccionados.")
 
@@ -160,16 +333,16 @@ elif view_type == 'Lista':
 st.subheader("Top 5 Inflables Más Rentados por Mes y Año")
 
 if not df_app.empty:
-    # Get unique years for the selectbox
-    df_app['YEAR'] = df_app['FECHA'].dt.year
-    df_app['MONTH'] = df_app['FECHA'].dt.month
+    trace.stage('top5_chart')
+    monthly_counts = bookings_snapshot.derived['monthly_counts']
 
-    all_years = sorted(df_app['YEAR'].unique().tolist(), reverse=True)
+    # Get unique years for the selectbox
+    all_years = sorted(monthly_counts['YEAR'].unique().tolist(), reverse=True)
     selected_year = st.selectbox("Selecciona el Año", options=all_years, key="select_year")
 
     # Filter months based on the selected year
-    available_months_for_year = df_app[df_app['YEAR'] == selected_year]['MONTH'].unique().tolist()
-    available_months_for_year.sort()
+    counts_for_year = monthly_counts[monthly_counts['YEAR'] == selected_year]
+    available_months_for_year = counts_for_year['MONTH'].unique().tolist()
 
     month_map = {
         1: 'Enero', 2: 'Febrero', 3: 'Marzo', 4: 'Abril', 5: 'Mayo', 6: 'Junio',
@@ -177,33 +350,66 @@ if not df_app.empty:
     }
     month_map_inv = {v: k for k, v in month_map.items()}
 
-    month_options = [month_map[m] for m in available_months_for_year]
-    selected_month_name = st.selectbox("Selecciona el Mes", options=month_options, key="select_month")
-    selected_month_num = month_map_inv.get(selected_month_name)
+    show_all_months = st.checkbox("Ver todos los meses del año", key="all_months")
 
-    if selected_year and selected_month_num:
-        df_filtered_by_date = df_app[
-            (df_app['YEAR'] == selected_year) &
-            (df_app['MONTH'] == selected_month_num)
-        ]
+    # Vega-Lite specs per (data version, year, month), shared by all sessions. Rendering
+    # a stored spec skips the top-N selection and Altair's chart building and validation.
+    figures = figure_cache('calendario_figures')
 
-        if not df_filtered_by_date.empty:
-            # Calculate top 5 most rented 'MODELO's
-            top_5_inflables = df_filtered_by_date['MODELO'].value_counts().nlargest(5).reset_index()
-            top_5_inflables.columns = ['MODELO', 'Conteo de Rentas']
+    if show_all_months:
+        def top_by_month_spec():
+            # Top N of every month in one pass over the counts table
+            top_by_month = counts_for_year.groupby('MONTH', sort=False).head(TOP_N_INFLABLES).copy()
+            top_by_month['Mes'] = top_by_month['MONTH'].map(month_map)
 
-            # Create Altair bar chart
-            chart = alt.Chart(top_5_inflables).mark_bar().encode(
+            return vega_lite_spec(alt.Chart(top_by_month).mark_bar().encode(
                 x=alt.X('Conteo de Rentas', title='Cantidad de Rentas'),
                 y=alt.Y('MODELO', sort='-x', title='Modelo de Inflable')
             ).properties(
-                title=f'Top 5 Inflables en {selected_month_name} de {selected_year}'
-            ).interactive()
+                width=250,
+                height=150
+            ).facet(
+                facet=alt.Facet('Mes', sort=[month_map[m] for m in available_months_for_year], title=None),
+                columns=3
+            ).resolve_scale(
+                y='independent'
+            ).properties(
+                title=f'Top {TOP_N_INFLABLES} Inflables por Mes en {selected_year}'
+            ))
 
-            st.altair_chart(chart, use_container_width=True)
-        else:
-            st.info(f"No se encontraron rentas para {selected_month_name} de {selected_year}.")
+        spec = figures.get((bookings_version, selected_year, 'all'), top_by_month_spec)
+        st.vega_lite_chart(spec)
+        trace.payload('top5_chart', spec)
+    else:
+        month_options = [month_map[m] for m in available_months_for_year]
+        selected_month_name = st.selectbox("Selecciona el Mes", options=month_options, key="select_month")
+        selected_month_num = month_map_inv.get(selected_month_name)
+
+        if selected_year and selected_month_num:
+            def top_5_spec():
+                # Top 5 most rented 'MODELO's, already ranked in the counts table
+                counts_for_month = counts_for_year[counts_for_year['MONTH'] == selected_month_num]
+                if counts_for_month.empty:
+                    return None
+                top_5_inflables = counts_for_month[['MODELO', 'Conteo de Rentas']].head(TOP_N_INFLABLES)
+
+                # Create Altair bar chart
+                return vega_lite_spec(alt.Chart(top_5_inflables).mark_bar().encode(
+                    x=alt.X('Conteo de Rentas', title='Cantidad de Rentas'),
+                    y=alt.Y('MODELO', sort='-x', title='Modelo de Inflable')
+                ).properties(
+                    title=f'Top 5 Inflables en {selected_month_name} de {selected_year}'
+                ).interactive())
+
+            spec = figures.get((bookings_version, selected_year, selected_month_num), top_5_spec)
+            if spec is not None:
+                st.vega_lite_chart(spec, use_container_width=True)
+                trace.payload('top5_chart', spec)
+            else:
+                st.info(f"No se encontraron rentas para {selected_month_name} de {selected_year}.")
 else:
     st.warning("La base de datos está vacía, no se pueden mostrar los inflables más rentados.")
 
 st.write("\n--- Creado con Streamlit y streamlit_calendar ---")
+
+trace.finish()
@@ -1,64 +1,133 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import os
+
+import dataset_watcher
+import perf_trace
+from figure_cache import figure_cache
+from data_loader import load_frame
 
 st.set_page_config(layout="wide")
 st.title("Análisis de Ventas y Profitabilidad")
 
-# Load data
-@st.cache_data
-def load_data(path):
-    df = pd.read_excel(path)
-    return df
+# Opt-in rerun timings (PERF_TRACE=1 or ?perf=1), see perf_trace.py
+trace = perf_trace.start('dashboardventas2025')
+
+TOP_N = 5
+# The only columns the dashboard reads; text columns are kept as categoricals
+ORDER_COLUMNS = ['Region', 'State', 'Product Name', 'Quantity', 'Profit']
+ORDER_CATEGORIES = ['Region', 'State', 'Product Name']
+
+# Pre-aggregate Quantity and Profit per product for every (Region, State) selection,
+# including the 'Todas'/'Todos' rollups, so the charts below are plain lookups.
+# Built once per workbook version by the dataset watcher and shared by every
+# session, so it must only be read.
+def build_sales_cube(df, version, top_n=TOP_N):
+    metrics = ['Quantity', 'Profit']
+    sums = df.groupby(['Region', 'State', 'Product Name'], as_index=False, observed=True)[metrics].sum()
+    flat = pd.concat([
+        sums,
+        sums.groupby(['Region', 'Product Name'], as_index=False, observed=True)[metrics].sum().assign(State='Todos'),
+        sums.groupby(['State', 'Product Name'], as_index=False, observed=True)[metrics].sum().assign(Region='Todas'),
+        sums.groupby('Product Name', as_index=False, observed=True)[metrics].sum().assign(Region='Todas', State='Todos'),
+    ], ignore_index=True)
+
+    cube = {}
+    for key, totals in flat.groupby(['Region', 'State'], sort=False):
+        cube[key] = {'totals': totals.set_index('Product Name')[metrics]}
+    for metric in metrics:
+        # Stable sort keeps products alphabetical on ties, like groupby(...).sum().nlargest()
+        ranked = flat.sort_values(['Region', 'State', metric], ascending=[True, True, False], kind='stable')
+        top = ranked.groupby(['Region', 'State'], sort=False).head(top_n)
+        for key, top_products in top.groupby(['Region', 'State'], sort=False):
+            top_products = top_products[['Product Name', metric]].reset_index(drop=True)
+            top_products['Product Name'] = top_products['Product Name'].astype(str)
+            cube[key][metric] = top_products
+
+    # Selectbox options, in order of first appearance like unique() would give.
+    # Pairs are deduplicated on the integer category codes, then mapped back to names.
+    region_names = df['Region'].cat.categories
+    state_names = df['State'].cat.categories
+    pairs = pd.DataFrame({'Region': df['Region'].cat.codes, 'State': df['State'].cat.codes}).drop_duplicates()
+    pairs = pairs[(pairs >= 0).all(axis=1)]  # code -1 is a missing value
+    states = {'Todas': state_names[pairs['State'].drop_duplicates()].tolist()}
+    for region_code, region_pairs in pairs.groupby('Region', sort=False):
+        states[region_names[region_code]] = state_names[region_pairs['State']].tolist()
+    regions = region_names[pairs['Region'].drop_duplicates()].tolist()
+    return {'regions': regions, 'states': states, 'cube': cube}
 
-df_orders = load_data('OrdersFinal.xlsx')
+def load_orders(path):
+    return load_frame(path, columns=ORDER_COLUMNS, categories=ORDER_CATEGORIES, downcast=True)
+
+# Load data (parsed once per workbook version and shared by all sessions, see data_loader.py).
+# A background watcher reloads the workbook and rebuilds the cube when it changes, so
+# reruns always get the last complete version without waiting (see dataset_watcher.py).
+# ORDERS_PATH points the dashboard at another workbook or a Parquet/CSV export (see benchmarks/)
+trace.stage('load')
+orders_path = os.environ.get('ORDERS_PATH', 'OrdersFinal.xlsx')
+orders = dataset_watcher.watch('orders', orders_path, load_orders, {'sales_cube': build_sales_cube})
+snapshot = orders.snapshot()
+sales_cube = snapshot.derived['sales_cube']
+if orders.error:
+    st.sidebar.warning(f"No se pudo recargar '{orders_path}' ({orders.error}); se muestran los datos anteriores.")
 
 # --- Region Filter ---
+trace.stage('filters')
 st.sidebar.header("Filtro por Región")
-regions = df_orders['Region'].unique().tolist()
+regions = sales_cube['regions']
 selected_region = st.sidebar.selectbox('Selecciona una Región', ['Todas'] + regions)
 
 if selected_region != 'Todas':
-    filtered_df = df_orders[df_orders['Region'] == selected_region]
     chart_title_suffix = f' en {selected_region}'
 else:
-    filtered_df = df_orders
     chart_title_suffix = ''
 
 # --- State Filter (dependent on Region) ---
 st.sidebar.header("Filtro por Estado")
-# Get unique states based on the current filtered_df (which is already filtered by region if applicable)
-states = filtered_df['State'].unique().tolist()
+# States available for the selected region (all of them for 'Todas')
+states = sales_cube['states'].get(selected_region, [])
 selected_state = st.sidebar.selectbox('Selecciona un Estado', ['Todos'] + states)
 
 if selected_state != 'Todos':
-    filtered_df = filtered_df[filtered_df['State'] == selected_state]
     if chart_title_suffix:
         chart_title_suffix = f'{chart_title_suffix}, {selected_state}'
     else:
         chart_title_suffix = f' en {selected_state}'
-else:
-    # If 'Todos' states, the filtered_df remains as filtered by region only
-    pass
+
+# Aggregates for the current selection; missing when no orders match the filters
+selection = sales_cube['cube'].get((selected_region, selected_state))
+
+# Built figures per (data version, chart, region, state), shared by all sessions,
+# so going back to a selection skips px.bar entirely
+figures = figure_cache('dashboard_figures')
 
 # --- Top 5 Most Sold Products Chart ---
+trace.stage('chart_quantity')
 st.header("Top 5 Productos Más Vendidos por Cantidad")
-if not filtered_df.empty:
-    top_products = filtered_df.groupby('Product Name')['Quantity'].sum().nlargest(5).reset_index()
-    fig_sold = px.bar(top_products, x='Product Name', y='Quantity', 
-                      title=f'Top 5 Productos Más Vendidos por Cantidad{chart_title_suffix}',
-                      labels={'Product Name': 'Producto', 'Quantity': 'Cantidad Total Vendida'})
+if selection is not None:
+    fig_sold = figures.get(
+        (snapshot.version, 'quantity', selected_region, selected_state),
+        lambda: px.bar(selection['Quantity'], x='Product Name', y='Quantity',
+                       title=f'Top 5 Productos Más Vendidos por Cantidad{chart_title_suffix}',
+                       labels={'Product Name': 'Producto', 'Quantity': 'Cantidad Total Vendida'}))
     st.plotly_chart(fig_sold, use_container_width=True)
+    trace.payload('chart_quantity', fig_sold)
 else:
     st.warning("No hay datos para mostrar con los filtros seleccionados.")
 
 # --- Top 5 Products by Profit Chart ---
+trace.stage('chart_profit')
 st.header("Top 5 Productos por Profit")
-if not filtered_df.empty:
-    top_profit_products = filtered_df.groupby('Product Name')['Profit'].sum().nlargest(5).reset_index()
-    fig_profit = px.bar(top_profit_products, x='Product Name', y='Profit', 
-                         title=f'Top 5 Productos por Profit{chart_title_suffix}',
-                         labels={'Product Name': 'Producto', 'Profit': 'Profit Total'})
+if selection is not None:
+    fig_profit = figures.get(
+        (snapshot.version, 'profit', selected_region, selected_state),
+        lambda: px.bar(selection['Profit'], x='Product Name', y='Profit',
+                       title=f'Top 5 Productos por Profit{chart_title_suffix}',
+                       labels={'Product Name': 'Producto', 'Profit': 'Profit Total'}))
     st.plotly_chart(fig_profit, use_container_width=True)
+    trace.payload('chart_profit', fig_profit)
 else:
     st.warning("No hay datos para mostrar con los filtros seleccionados.")
+
+trace.finish()
@@ -0,0 +1,392 @@
+"""Shared helpers for loading the Excel workbooks behind the Streamlit apps."""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from pandas.io.parsers import TextParser
+
+import perf_trace
+
+# Columnar copies of the workbooks live in this folder, next to the source file
+CACHE_DIR_NAME = '.cache'
+_SIGNATURE_KEY = b'source_signature'
+
+# Rows per chunk when streaming a workbook with iter_excel_chunks
+EXCEL_CHUNK_ROWS = 50_000
+
+# Upper bound for the parsed frames kept in memory by load_frame
+MEMORY_BUDGET_BYTES = 512 * 1024 * 1024
+
+# With SHARED_DATASET=1, load_frame keeps converted frames in memory-mapped Arrow
+# files under `.cache/` that every session and every Streamlit process maps
+SHARED_DATASET = os.environ.get('SHARED_DATASET', '').lower() in ('1', 'true', 'yes')
+
+# path -> ((size, mtime_ns), sha256) for the workbooks hashed by this process
+_versions = {}
+
+# (sha256, reader, conversions) -> (frame, nbytes), least recently used first. Module
+# state is shared by every session served by this process.
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_version(path):
+    """Content hash of `path`, re-hashed only when its size or mtime changes."""
+    stat = os.stat(path)
+    stat_key = (stat.st_size, stat.st_mtime_ns)
+    known = _versions.get(path)
+    if known is None or known[0] != stat_key:
+        known = (stat_key, file_sha256(path))
+        _versions[path] = known
+    return known[1]
+
+
+def columnar_cache_path(path):
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, os.path.basename(path) + '.parquet')
+
+
+def _read_cached_signature(cache_path):
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        return json.loads(metadata[_SIGNATURE_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+
+def _write_columnar_cache(df, cache_path, signature):
+    try:
+        table = pa.Table.from_pandas(df)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_SIGNATURE_KEY] = json.dumps(signature).encode()
+        table = table.replace_schema_metadata(metadata)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Write to a temporary file first so readers never see a half-written cache
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except (OSError, pa.ArrowException):
+        # The cache is only an optimization; the parsed frame is still good
+        pass
+
+
+def iter_excel_chunks(path, columns=None, chunk_size=EXCEL_CHUNK_ROWS):
+    """Stream the first sheet of a workbook as DataFrames of up to `chunk_size` rows.
+
+    Rows are read with openpyxl's read-only mode and only the cells of
+    `columns` (matched against the header row; all columns when None) are
+    kept, so memory grows with the columns used rather than the sheet's width.
+    Each chunk is converted to typed columns before the next one is read.
+
+    Headers are named as pd.read_excel names them ('Unnamed: N' for blank
+    cells, 'X.1' for a repeated 'X'). Columns past the last cell with data may
+    still be present as empty 'Unnamed: N' columns; read_excel_columns drops them.
+    """
+    # Opened as a file object: openpyxl refuses paths without an Excel extension,
+    # and some workbooks here are named *.py
+    with open(path, 'rb') as source:
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            names = _header_names(header)
+            wanted = names if columns is None else [name for name in columns if name in names]
+            positions = [names.index(name) for name in wanted]
+
+            values = [[] for _ in wanted]
+            empty_run = 0
+            for row in rows:
+                picked = [row[i] if i < len(row) else None for i in positions]
+                if all(value is None for value in picked):
+                    # Blank rows only count if data follows them, as with pd.read_excel
+                    empty_run += 1
+                    continue
+                for _ in range(empty_run):
+                    for column_values in values:
+                        column_values.append(None)
+                empty_run = 0
+                for column_values, value in zip(values, picked):
+                    column_values.append(value)
+                if len(values[0]) >= chunk_size:
+                    yield _typed_chunk(wanted, values)
+                    values = [[] for _ in wanted]
+            if wanted and values[0]:
+                yield _typed_chunk(wanted, values)
+        finally:
+            workbook.close()
+
+
+def _header_names(header):
+    # Cells converted as pd.read_excel converts them, then named by the same parser
+    cells = ['' if cell is None else int(cell) if isinstance(cell, float) and cell.is_integer() else cell
+             for cell in header]
+    return TextParser([cells], header=0).read().columns.tolist()
+
+
+def _typed_chunk(names, values):
+    chunk = pd.DataFrame(dict(zip(names, values))).infer_objects()
+    for name in chunk.columns[chunk.isna().all()]:
+        # Blank columns read as NaN floats, not None objects
+        chunk[name] = chunk[name].astype('float64')
+    for name in chunk.select_dtypes('object').columns:
+        if chunk[name].hasnans:
+            # Blank cells in text columns are NaN, as with pd.read_excel, not None
+            chunk[name] = chunk[name].where(chunk[name].notna(), np.nan)
+    for name in chunk.select_dtypes('float').columns:
+        column = chunk[name]
+        # Excel stores every number as a float; whole-number columns become integers
+        if column.notna().all() and (column % 1 == 0).all():
+            chunk[name] = column.astype('int64')
+    return chunk
+
+
+def read_excel_columns(path, columns=None, chunk_size=EXCEL_CHUNK_ROWS):
+    """Read `columns` of a workbook's first sheet with iter_excel_chunks."""
+    chunks = list(iter_excel_chunks(path, columns, chunk_size))
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(_align_chunk_dtypes(chunks), ignore_index=True)
+    # Trailing columns with neither a header nor data (e.g. only formatted) are not
+    # part of the sheet for pd.read_excel
+    width = len(df.columns)
+    while (width and isinstance(df.columns[width - 1], str)
+           and df.columns[width - 1].startswith('Unnamed: ') and df.iloc[:, width - 1].isna().all()):
+        width -= 1
+    return df.iloc[:, :width]
+
+
+def _align_chunk_dtypes(chunks):
+    # A column that is blank for a whole chunk is typed as NaN floats there; give it
+    # the type the column has in the other chunks, so concat keeps e.g. datetime64
+    for name in chunks[0].columns:
+        dtypes = {chunk[name].dtype for chunk in chunks if not chunk[name].isna().all()}
+        if len(dtypes) != 1:
+            continue
+        dtype = dtypes.pop()
+        if dtype.kind not in 'Mmo':
+            continue  # numbers: float NaN already concatenates cleanly
+        for i, chunk in enumerate(chunks):
+            if chunk[name].dtype != dtype and chunk[name].isna().all():
+                chunks[i] = chunk = chunk.copy(deep=False)
+                chunk[name] = chunk[name].astype(dtype)
+    return chunks
+
+
+def _covers(cached_columns, columns):
+    return cached_columns is None or (columns is not None and set(columns) <= set(cached_columns))
+
+
+def read_excel_cached(path, columns=None):
+    """Read an Excel workbook through a Parquet copy stored in `.cache/`.
+
+    The copy is keyed on the workbook's size, mtime and SHA-256, so the xlsx is
+    only parsed again when its content actually changes. With `columns`, only
+    those columns are parsed (see iter_excel_chunks) and cached. A caller that
+    needs columns the copy lacks triggers one more parse, of those columns plus
+    the ones already cached, so callers with different columns share the copy.
+    """
+    stat = os.stat(path)
+    cache_path = columnar_cache_path(path)
+    cached = _read_cached_signature(cache_path)
+    usable = cached is not None and _covers(cached.get('columns'), columns)
+
+    if usable and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return _read_parquet_columns(cache_path, columns)
+
+    signature = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_version(path)}
+    if usable and cached['size'] == signature['size'] and cached['sha256'] == signature['sha256']:
+        # Same content with a new mtime (e.g. a fresh checkout): refresh the key only
+        df = pd.read_parquet(cache_path)
+        signature['columns'] = cached.get('columns')
+    else:
+        if columns is not None and cached is not None and cached.get('columns') is not None:
+            columns_to_parse = list(dict.fromkeys(cached['columns'] + list(columns)))
+        else:
+            columns_to_parse = None if columns is None else list(columns)
+        df = read_excel_columns(path, columns_to_parse)
+        signature['columns'] = columns_to_parse
+    _write_columnar_cache(df, cache_path, signature)
+    return df if columns is None else df[[column for column in columns if column in df.columns]]
+
+
+def _read_parquet_columns(path, columns=None):
+    if columns is None:
+        return pd.read_parquet(path)
+    # Only the requested columns are read; ones the file lacks are skipped, not an error
+    names = set(pq.read_schema(path).names)
+    return pd.read_parquet(path, columns=[column for column in columns if column in names])
+
+
+def read_source(path, columns=None):
+    """Read a Parquet or CSV export directly, and anything else as a cached workbook.
+
+    With `columns`, only those columns are read where the format allows it.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        return _read_parquet_columns(path, columns)
+    if extension == '.csv':
+        return pd.read_csv(path, usecols=None if columns is None else lambda name: name in set(columns))
+    return read_excel_cached(path, columns)
+
+
+def clear_caches():
+    """Forget every memoized frame and file hash (used by the benchmarks)."""
+    with _frames_lock:
+        _frames.clear()
+    _versions.clear()
+
+
+def _convert_dtypes(df, columns, dates, categories, downcast, sort_by):
+    if columns is not None:
+        kept = [column for column in columns if column in df.columns]
+        if kept != list(df.columns):
+            # An explicit copy, so the conversions below never write into the reader's frame
+            df = df[kept].copy()
+    for column in dates:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    for column in categories:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    if downcast:
+        for column in df.select_dtypes('integer').columns:
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    if sort_by in df.columns:
+        df = df.sort_values(sort_by, kind='stable', ignore_index=True)
+    return df
+
+
+def _read(reader, path, columns):
+    # Readers only need to accept `columns` if callers prune with them
+    return reader(path) if columns is None else reader(path, columns=columns)
+
+
+def _reader_name(reader):
+    # Stable across processes, unlike the function object itself
+    return f'{reader.__module__}.{reader.__qualname__}'
+
+
+def shared_frame_path(path, version, conversions):
+    """Arrow file holding `path` at `version` after the given load_frame conversions."""
+    digest = hashlib.sha256(repr(conversions).encode()).hexdigest()[:12]
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    return os.path.join(cache_dir, f'{os.path.basename(path)}.{version[:16]}.{digest}.arrow')
+
+
+def _string_dtype(arrow_type):
+    # Arrow-backed strings keep pointing into the mapped file instead of becoming Python objects
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype('pyarrow')
+    return None
+
+
+def _map_shared_frame(shared_path):
+    try:
+        source = pa.memory_map(shared_path)
+        table = ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowException):
+        return None
+    # split_blocks keeps each numeric, datetime and categorical-code column a view of the mapping
+    return table.to_pandas(split_blocks=True, types_mapper=_string_dtype)
+
+
+def _write_shared_frame(df, shared_path):
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        os.makedirs(os.path.dirname(shared_path), exist_ok=True)
+        tmp_path = f'{shared_path}.{os.getpid()}.tmp'
+        # Uncompressed, so readers can map the buffers as they are on disk
+        with ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, shared_path)
+    except (OSError, pa.ArrowException):
+        return False
+    _remove_stale_shared_frames(shared_path)
+    return True
+
+
+def _remove_stale_shared_frames(shared_path):
+    # Same source and conversions, older content versions. Processes still mapping
+    # one keep their view; the space is freed once they let go of it.
+    cache_dir = os.path.dirname(shared_path)
+    source_name, _, digest, _ = os.path.basename(shared_path).rsplit('.', 3)
+    for entry in os.scandir(cache_dir):
+        parts = entry.name.rsplit('.', 3)
+        if (len(parts) == 4 and parts[0] == source_name and parts[2] == digest
+                and parts[3] == 'arrow' and entry.path != shared_path):
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def _load_shared_frame(path, version, reader, conversions):
+    shared_path = shared_frame_path(path, version, (_reader_name(reader),) + conversions)
+    df = _map_shared_frame(shared_path)
+    if df is None:
+        df = _convert_dtypes(_read(reader, path, conversions[0]), *conversions)
+        if _write_shared_frame(df, shared_path):
+            # Serve the mapped copy too, so this process holds no private one
+            df = _map_shared_frame(shared_path)
+    return df
+
+
+def load_frame(path, columns=None, dates=(), categories=(), downcast=False, sort_by=None,
+               reader=read_source):
+    """Load a data file once per content version and keep it in memory.
+
+    `reader` turns the file into a DataFrame (see read_source). Only `columns`
+    are kept when given; they are passed on as `reader(path, columns=...)` so
+    the reader can skip the rest of the file. `downcast` narrows integer
+    columns to the smallest dtype that holds them. Frames are memoized on the file's content
+    hash plus the reader and conversions, and the least recently used ones are
+    dropped once their total size passes MEMORY_BUDGET_BYTES. Callers get a
+    shallow copy, so adding or replacing columns never touches the shared frame.
+
+    With SHARED_DATASET on, the converted frame is written once to an Arrow file
+    in `.cache/` and then memory-mapped, so every process serving the app shares
+    the same pages. Mapped columns are read-only; text columns come back as
+    Arrow-backed strings (categoricals stay categoricals).
+    """
+    version = file_version(path)
+    conversions = (None if columns is None else tuple(columns), tuple(dates), tuple(categories),
+                   downcast, sort_by)
+    key = (version, reader) + conversions
+    with _frames_lock:
+        if key in _frames:
+            _frames.move_to_end(key)
+            perf_trace.count('load_frame', hit=True)
+            return _frames[key][0].copy(deep=False)
+
+    perf_trace.count('load_frame', hit=False)
+    if SHARED_DATASET:
+        df = _load_shared_frame(path, version, reader, conversions)
+    else:
+        df = _convert_dtypes(_read(reader, path, columns), *conversions)
+    nbytes = int(df.memory_usage(deep=True).sum())
+    with _frames_lock:
+        _frames[key] = (df, nbytes)
+        total = sum(size for _, size in _frames.values())
+        while total > MEMORY_BUDGET_BYTES and len(_frames) > 1:
+            _, (_, size) = _frames.popitem(last=False)
+            total -= size
+    return df.copy(deep=False)
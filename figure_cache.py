@@ -0,0 +1,74 @@
+"""Bounded LRU caches of built charts, shared by every session of the process.
+
+Charts are keyed by the data version plus the filters that shaped them, so
+going back to a selection skips both the data lookup and the figure build.
+Each cache counts its hits and misses, and reports them to perf_trace under
+its own name.
+"""
+import threading
+from collections import OrderedDict
+
+import perf_trace
+
+# Charts kept per cache; a top-5 bar chart is a few KB
+DEFAULT_MAX_ENTRIES = 256
+
+# name -> FigureCache
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class FigureCache:
+    def __init__(self, name, max_entries=DEFAULT_MAX_ENTRIES):
+        self.name = name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """The chart stored under `key`, calling `build()` to make it on a miss.
+
+        The same object is handed to every session, so it must not be modified.
+        """
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                perf_trace.count(self.name, hit=True)
+                return self._figures[key]
+        figure = build()
+        with self._lock:
+            self.misses += 1
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        perf_trace.count(self.name, hit=False)
+        return figure
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+            self.hits = self.misses = 0
+
+
+def figure_cache(name, max_entries=DEFAULT_MAX_ENTRIES):
+    """Return the process-wide cache called `name`, creating it on first use."""
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = FigureCache(name, max_entries)
+    return cache
+
+
+def clear_all():
+    """Empty every cache and reset its counters (used by the benchmarks)."""
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.clear()
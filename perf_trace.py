@@ -0,0 +1,149 @@
+"""Opt-in timing of the Streamlit apps' reruns.
+
+Enable it with the PERF_TRACE=1 environment variable or by opening the app
+with `?perf=1`. Each rerun is split into named stages with `stage(name)`;
+the stage lasts until the next `stage()` call or until `finish()`. Cache
+hits and misses and the size of the payloads sent to the browser are counted
+alongside. `finish()` shows everything in a collapsed debug panel and appends
+one JSON line per rerun to PERF_LOG_PATH (perf_log.jsonl by default).
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+LOG_PATH = os.environ.get('PERF_LOG_PATH', 'perf_log.jsonl')
+
+_local = threading.local()
+
+
+def _enabled():
+    if os.environ.get('PERF_TRACE', '').lower() in ('1', 'true', 'yes'):
+        return True
+    import streamlit as st
+    try:
+        return st.query_params.get('perf') in ('1', 'true')
+    except Exception:
+        return False
+
+
+class Trace:
+    """Timings, cache counters and payload sizes of one rerun."""
+
+    enabled = True
+
+    def __init__(self, app):
+        self.app = app
+        self.stages = {}
+        self.cache = {}
+        self.payloads = {}
+        self._started = time.perf_counter()
+        self._stage = None
+        self._stage_started = None
+
+    def stage(self, name):
+        now = time.perf_counter()
+        self._close_stage(now)
+        self._stage, self._stage_started = name, now
+
+    def _close_stage(self, now):
+        if self._stage is not None:
+            self.stages[self._stage] = self.stages.get(self._stage, 0.0) + now - self._stage_started
+            self._stage = None
+
+    def count(self, name, hit):
+        counts = self.cache.setdefault(name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+    def payload(self, name, value):
+        measured_at = time.perf_counter()
+        self.payloads[name] = payload_size(value)
+        if self._stage is not None:
+            # Serializing to measure the payload is tracing overhead, not part of the stage
+            self._stage_started += time.perf_counter() - measured_at
+
+    def record(self):
+        return {
+            'app': self.app,
+            'at': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            'cache': self.cache,
+            'payload_bytes': self.payloads,
+        }
+
+    def finish(self):
+        self._close_stage(time.perf_counter())
+        if getattr(_local, 'trace', None) is self:
+            _local.trace = None
+        record = self.record()
+        try:
+            with open(LOG_PATH, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError:
+            pass
+        _render(record)
+        return record
+
+
+class _NoTrace:
+    """Stand-in used when tracing is off, so call sites need no checks."""
+
+    enabled = False
+
+    def stage(self, name):
+        pass
+
+    def count(self, name, hit):
+        pass
+
+    def payload(self, name, value):
+        pass
+
+    def finish(self):
+        return None
+
+
+_NO_TRACE = _NoTrace()
+
+
+def start(app):
+    """Begin tracing this rerun of `app`, or return a no-op trace when disabled."""
+    trace = Trace(app) if _enabled() else _NO_TRACE
+    _local.trace = trace if trace.enabled else None
+    return trace
+
+
+def current():
+    return getattr(_local, 'trace', None) or _NO_TRACE
+
+
+def count(name, hit):
+    """Count a cache hit or miss on the rerun being traced on this thread, if any."""
+    current().count(name, hit)
+
+
+def payload_size(value):
+    """Approximate bytes sent to the browser for events, frames and charts."""
+    if hasattr(value, 'to_json') and not hasattr(value, 'columns'):
+        # Plotly figures and Altair charts
+        return len(value.to_json().encode())
+    if hasattr(value, 'columns'):
+        import pyarrow as pa
+        return pa.Table.from_pandas(value, preserve_index=False).nbytes
+    return len(json.dumps(value, default=str).encode())
+
+
+def _render(record):
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander(f"Rendimiento de la ejecución ({record['total_ms']:.1f} ms)", expanded=False):
+        st.dataframe(pd.DataFrame(
+            {'Etapa': list(record['stages_ms']), 'ms': list(record['stages_ms'].values())}
+        ), hide_index=True)
+        if record['cache']:
+            st.dataframe(pd.DataFrame.from_dict(record['cache'], orient='index'))
+        if record['payload_bytes']:
+            st.json(record['payload_bytes'])
@@ -1,6 +1,5 @@
-from collections import namedtuple
 import altair as alt
-import math
+import numpy as np
 import pandas as pd
 import streamlit as st
 
@@ -17,22 +16,32 @@ In the meantime, below is an example of what you can do with just a few lines of
 st.header('_Hola, esta es mi primera app de Streamlit!!_ is :blue[cool] :sunglasses:')
 
 with st.echo(code_location='below'):
-    total_points = st.slider("Number of points in spiral", 1, 5000, 2000)
+    total_points = st.slider("Number of points in spiral", 1, 1_000_000, 2000)
     num_turns = st.slider("Number of turns in spiral", 1, 100, 9)
 
-    Point = namedtuple('Point', 'x y')
-    data = []
+    # Vega-Lite draws a few thousand marks smoothly; larger spirals are downsampled
+    MAX_DRAWN_POINTS = 5000
 
-    points_per_turn = total_points / num_turns
+    # Bounded: the sliders allow millions of (total_points, num_turns) pairs
+    @st.cache_data(max_entries=64)
+    def spiral(total_points, num_turns):
+        point_num = np.arange(total_points)
+        points_per_turn = total_points / num_turns
 
-    for curr_point_num in range(total_points):
-        curr_turn, i = divmod(curr_point_num, points_per_turn)
-        angle = (curr_turn + 1) * 2 * math.pi * i / points_per_turn
-        radius = curr_point_num / total_points
-        x = radius * math.cos(angle)
-        y = radius * math.sin(angle)
-        data.append(Point(x, y))
+        curr_turn, i = np.divmod(point_num, points_per_turn)
+        angle = (curr_turn + 1) * 2 * np.pi * i / points_per_turn
+        radius = point_num / total_points
+        data = pd.DataFrame({'x': radius * np.cos(angle), 'y': radius * np.sin(angle)})
 
-    st.altair_chart(alt.Chart(pd.DataFrame(data), height=500, width=500)
+        if total_points > MAX_DRAWN_POINTS:
+            # Evenly spaced points along the spiral keep its shape
+            data = data.iloc[np.linspace(0, total_points - 1, MAX_DRAWN_POINTS).astype(int)]
+        return data
+
+    data = spiral(total_points, num_turns)
+    if len(data) < total_points:
+        st.caption(f"Showing {len(data):,} of {total_points:,} points")
+
+    st.altair_chart(alt.Chart(data, height=500, width=500)
         .mark_circle(color='#0068c9', opacity=0.5)
         .encode(x='x:Q', y='y:Q'))
@@ -0,0 +1,87 @@
+import shutil
+import sqlite3
+import sys
+import zipfile
+from pathlib import Path
+
+import openpyxl
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import bookings_store  # noqa: E402
+
+WORKBOOK = ROOT / 'Control de Fechas 2025 Auto Finaaaal.xlsx'
+
+
+def _booking(db_path, nombre):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT DIRECCION, SALDO FROM bookings WHERE NOMBRE = ?", (nombre,)).fetchall()
+    finally:
+        conn.close()
+
+
+def test_reingest_keeps_edits_to_a_changed_workbook(tmp_path):
+    workbook = tmp_path / 'bookings.xlsx'
+    db_path = tmp_path / 'bookings.sqlite'
+    shutil.copy(WORKBOOK, workbook)
+    bookings_store.ingest([str(workbook)], db_path)
+
+    wb = openpyxl.load_workbook(workbook)
+    sheet = wb.worksheets[0]
+    header = [cell.value for cell in sheet[1]]
+    nombre = sheet.cell(2, header.index('NOMBRE') + 1).value
+    assert _booking(db_path, nombre) == [('Avenida del Sol, Lote 5, Cancún', 1400)]
+
+    # Non-key fields only, so the booking keeps its key
+    sheet.cell(2, header.index('DIRECCION') + 1).value = 'Calle Nueva 12, Mérida'
+    sheet.cell(2, header.index('SALDO') + 1).value = 900
+    wb.save(workbook)
+
+    summary = bookings_store.ingest([str(workbook)], db_path)
+    assert summary['ingested'] == [str(workbook.resolve())]
+    assert _booking(db_path, nombre) == [('Calle Nueva 12, Mérida', 900)]
+
+
+
+def test_resaving_an_unedited_snapshot_keeps_the_first_seen_text(tmp_path):
+    # Same names as in the repo: the accented workbook sorts first, the cleaned copy second
+    workbook = tmp_path / WORKBOOK.name
+    cleaned = tmp_path / 'cleanedcontroldefechas2025.py'
+    db_path = tmp_path / 'bookings.sqlite'
+    shutil.copy(WORKBOOK, workbook)
+    shutil.copy(ROOT / cleaned.name, cleaned)
+    bookings_store.ingest([str(tmp_path)], db_path)
+
+    def shared_modelos():
+        # Bookings both snapshots contain, with the text the store keeps for them
+        conn = sqlite3.connect(db_path)
+        try:
+            return dict(conn.execute(
+                "SELECT booking_key, MODELO FROM bookings WHERE booking_key IN "
+                "(SELECT booking_key FROM booking_sources GROUP BY booking_key HAVING COUNT(*) > 1)"))
+        finally:
+            conn.close()
+
+    before = shared_modelos()
+    assert any(not modelo.isascii() for modelo in before.values())
+
+    # Saved again without edits: new bytes and mtime, same rows
+    with open(cleaned, 'rb') as f:  # openpyxl only opens *.py workbooks as file objects
+        wb = openpyxl.load_workbook(f)
+    wb.save(cleaned)
+    summary = bookings_store.ingest([str(tmp_path)], db_path)
+    assert summary['ingested'] == [str(cleaned)]
+    assert shared_modelos() == before
+
+def test_broken_workbook_does_not_abort_the_others(tmp_path):
+    shutil.copy(WORKBOOK, tmp_path / 'good.xlsx')
+    # Passes the magic-byte check but has no readable sheet
+    with zipfile.ZipFile(tmp_path / 'broken.xlsx', 'w') as archive:
+        archive.writestr('xl/workbook.xml', 'not a workbook')
+
+    summary = bookings_store.ingest([str(tmp_path)], tmp_path / 'bookings.sqlite')
+    assert summary['ingested'] == [str(tmp_path / 'good.xlsx')]
+    assert list(summary['failed']) == [str(tmp_path / 'broken.xlsx')]
+    assert summary['bookings'] > 0
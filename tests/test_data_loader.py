@@ -0,0 +1,64 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.styles import Font
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import data_loader  # noqa: E402
+
+
+def _workbook(path, rows, formatted_cells=()):
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    for row in rows:
+        sheet.append(row)
+    for cell in formatted_cells:
+        sheet[cell].font = Font(bold=True)
+    wb.save(path)
+    return path
+
+
+def _assert_reads_like_pandas(path, columns=None, chunk_sizes=(1, 2, 1000)):
+    expected = pd.read_excel(path)
+    if columns is not None:
+        expected = expected[columns]
+    for chunk_size in chunk_sizes:
+        pd.testing.assert_frame_equal(data_loader.read_excel_columns(path, columns, chunk_size), expected)
+
+
+def test_duplicate_and_blank_headers_are_named_like_pandas(tmp_path):
+    path = _workbook(tmp_path / 'headers.xlsx', [
+        ['X', 'X', None, 'X.1', 'X', 7],
+        [1, 2, 3, 4, 5, 6],
+        [7, 8, 9, 10, 11, 12],
+    ])
+    _assert_reads_like_pandas(path)
+    assert list(data_loader.read_excel_columns(path).columns) == ['X', 'X.2', 'Unnamed: 2', 'X.1', 'X.3', 7]
+    _assert_reads_like_pandas(path, columns=['X.2', 'Unnamed: 2'])
+
+
+def test_formatted_empty_cells_add_no_columns(tmp_path):
+    path = _workbook(tmp_path / 'formatted.xlsx', [['A', 'B'], [1, 'x'], [2, 'y']], formatted_cells=['D1', 'F5'])
+    _assert_reads_like_pandas(path)
+    assert list(data_loader.read_excel_columns(path).columns) == ['A', 'B']
+
+
+@pytest.mark.filterwarnings('error')
+def test_chunks_with_a_blank_column_keep_its_type(tmp_path):
+    path = _workbook(tmp_path / 'blank_chunk.xlsx', [
+        ['FECHA', 'MODELO', 'NOTA'],
+        [datetime(2025, 1, 1), 'a', 'x'],
+        [datetime(2025, 1, 2), 'b', 'y'],
+        [None, 'c', None],
+        [None, 'd', None],
+        [datetime(2025, 1, 5), 'e', 'z'],
+    ])
+    df = data_loader.read_excel_columns(path, chunk_size=2)
+    assert df['FECHA'].dtype == 'datetime64[ns]'
+    _assert_reads_like_pandas(path)